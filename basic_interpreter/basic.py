@@ -1,18 +1,27 @@
+import functools
 from typing import List, Optional
+from .compiler import Bytecode
 from .lexer import Lexer
 from .parser import Parser
 from .interpreter import Interpreter
 
 class Basic:
+    LINE_CACHE_SIZE = 4096
+
     def __init__(self):
         self.interpreter = Interpreter()
+        # Per instance: compiled slots are only valid for this interpreter
+        self._compile = functools.lru_cache(maxsize=self.LINE_CACHE_SIZE)(self._compile_line)
 
-    def run_line(self, line: str) -> None:
+    def _compile_line(self, line: str) -> Bytecode:
         lexer = Lexer(line)
         tokens = lexer.tokenize()
-        parser = Parser(tokens)
+        parser = Parser(tokens, line)
         ast = parser.parse()
-        self.interpreter.interpret(ast)
+        return self.interpreter.compile(ast)
+
+    def run_line(self, line: str) -> None:
+        self.interpreter.run(self._compile(line))
 
     def run_program(self, program: str) -> None:
         # Split program into lines and run each line
@@ -0,0 +1,333 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+from .parser import (
+    ASTNode, NumberNode, StringNode, VariableNode, BinOpNode,
+    UnaryOpNode, AssignNode, PrintNode, InputNode, IfNode,
+    ForNode, GotoNode, IfCmpConstNode, ForConstRangeNode, PrintSingleVarNode,
+    ReduceLoopNode
+)
+
+# Opcodes. Interpreter.run compares against these literal values, hottest
+# first, so keep both in sync; new opcodes are appended to keep numbers stable.
+OP_LOAD_VAR = 0        # arg: slot
+OP_LOAD_CONST = 1      # arg: const index
+OP_STORE_VAR = 2       # arg: slot
+# 3 and 8-16 were per-operator stack opcodes, replaced by BINOP
+OP_FOR_TEST = 4        # args: slot, exit target
+# 5 and 6 were FOR_INCR and JUMP, replaced by FOR_NEXT
+OP_JUMP_IF_FALSE = 7   # arg: target
+OP_NEG = 17
+OP_PRINT = 18          # arg: number of values
+OP_POP = 19
+OP_FOR_INIT = 20       # arg: slot
+OP_INPUT = 21          # arg: slot
+OP_GOTO = 22           # arg: line number
+OP_LINE_END = 23
+# Superinstructions
+OP_IF_VAR_CMP_CONST = 24  # args: slot, const index, comparison index, target
+OP_FOR_UP_NEXT = 25       # args: slot, step index, end index, body target
+OP_FOR_DOWN_NEXT = 26     # args: slot, step index, end index, body target
+OP_PRINT_VAR = 27         # arg: slot
+OP_REDUCE = 28            # args: const index of the ReduceLoopNode, target past the loop
+OP_VAR_BINOP_CONST = 29   # args: slot, operator index, const index
+OP_VAR_BINOP_VAR = 30     # args: slot, operator index, right slot
+OP_FOR_NEXT = 31          # args: slot, body target
+OP_BINOP_CONST = 32       # args: operator index, const index; left operand on the stack
+OP_BINOP_VAR = 33         # args: operator index, slot; left operand on the stack
+OP_BINOP = 34             # arg: operator index; both operands on the stack
+OP_REDUCE_FOR = 35        # args: as REDUCE; start, end and step on the stack
+
+# Postorder expression code for the tree-walker, as (op, arg) pairs
+RPN_CONST = 0   # arg: value
+RPN_LOAD = 1    # arg: slot
+RPN_BINOP = 2   # arg: operator function
+RPN_NEG = 3
+
+def compile_expr(node: ASTNode) -> List[Tuple[int, Any]]:
+    """Flatten a resolved expression tree into postorder (op, arg) pairs."""
+    code: List[Tuple[int, Any]] = []
+    _emit_expr(node, code)
+    return code
+
+def _emit_expr(node: ASTNode, code: List[Tuple[int, Any]]) -> None:
+    if isinstance(node, BinOpNode):
+        _emit_expr(node.left, code)
+        _emit_expr(node.right, code)
+        code.append((RPN_BINOP, node.op_fn))
+    elif isinstance(node, UnaryOpNode):
+        _emit_expr(node.expr, code)
+        if node.op_token.value == '-':
+            code.append((RPN_NEG, None))
+        elif node.op_token.value != '+':
+            raise Exception(f'Unknown unary operator: {node.op_token.value}')
+    elif isinstance(node, VariableNode):
+        code.append((RPN_LOAD, node.slot))
+    elif isinstance(node, (NumberNode, StringNode)):
+        code.append((RPN_CONST, node.token.value))
+    else:
+        raise Exception(f'Not an expression: {type(node).__name__}')
+
+EXPRESSION_NODES = (NumberNode, StringNode, VariableNode, BinOpNode, UnaryOpNode)
+
+class DispatchTable(dict):
+    """Maps node classes to their handlers; unknown classes get a clear error."""
+
+    def __init__(self, kind: str, handlers: Dict[type, Any]):
+        super().__init__(handlers)
+        self.kind = kind
+
+    def __missing__(self, node_type: type):
+        raise Exception(f'No {self.kind} found for {node_type.__name__}')
+
+@dataclass
+class Bytecode:
+    code: List[int]
+    consts: List[Any]
+    names: List[str]        # variable name for each slot
+    line_starts: List[int]  # offset of each top-level statement, for GOTO
+
+class Compiler:
+    """Compiles a parsed program into flat bytecode for Interpreter.run.
+
+    Every variable name is given an integer slot the first time it is seen.
+    Slots stay valid across compile() calls, so programs run line by line
+    share one table, and the tree-walker uses the same slots via resolve().
+    """
+
+    def __init__(self):
+        self.var_index: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.code: List[int] = []
+        self.consts: List[Any] = []
+        self.has_goto = False
+        self._dispatch = DispatchTable('compiler', {
+            NumberNode: self.compile_NumberNode,
+            StringNode: self.compile_StringNode,
+            VariableNode: self.compile_VariableNode,
+            BinOpNode: self.compile_BinOpNode,
+            UnaryOpNode: self.compile_UnaryOpNode,
+            AssignNode: self.compile_AssignNode,
+            PrintNode: self.compile_PrintNode,
+            InputNode: self.compile_InputNode,
+            IfNode: self.compile_IfNode,
+            ForNode: self.compile_ForNode,
+            GotoNode: self.compile_GotoNode,
+            IfCmpConstNode: self.compile_IfCmpConstNode,
+            ForConstRangeNode: self.compile_ForConstRangeNode,
+            PrintSingleVarNode: self.compile_PrintSingleVarNode,
+            ReduceLoopNode: self.compile_ReduceLoopNode,
+        })
+
+    def name_index(self, name: str) -> int:
+        index = self.var_index.get(name)
+        if index is None:
+            index = self.var_index[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def const_index(self, value: Any) -> int:
+        self.consts.append(value)
+        return len(self.consts) - 1
+
+    def emit(self, *words: int) -> int:
+        self.code.extend(words)
+        return len(self.code) - len(words)
+
+    def resolve(self, program: List[ASTNode]) -> None:
+        """Attach a variable slot to every node that reads or writes one."""
+        for node in program:
+            self.resolve_node(node)
+
+    def resolve_node(self, node: ASTNode) -> None:
+        if isinstance(node, VariableNode):
+            node.slot = self.name_index(node.token.value)
+        elif isinstance(node, BinOpNode):
+            # Cached expression code embeds slots, so drop it when re-resolving
+            node.code = None
+            self.resolve_node(node.left)
+            self.resolve_node(node.right)
+        elif isinstance(node, UnaryOpNode):
+            node.code = None
+            self.resolve_node(node.expr)
+        elif isinstance(node, AssignNode):
+            self.resolve_node(node.value)
+            node.slot = self.name_index(node.name)
+        elif isinstance(node, PrintNode):
+            for expr in node.expressions:
+                self.resolve_node(expr)
+        elif isinstance(node, InputNode):
+            node.slots = [self.name_index(var_name) for var_name in node.variables]
+        elif isinstance(node, IfNode):
+            self.resolve_node(node.condition)
+            self.resolve_node(node.then_statement)
+        elif isinstance(node, ForNode):
+            node.slot = self.name_index(node.variable)
+            self.resolve_node(node.start)
+            self.resolve_node(node.end)
+            if node.step is not None:
+                self.resolve_node(node.step)
+            for statement in node.body:
+                self.resolve_node(statement)
+        elif isinstance(node, IfCmpConstNode):
+            node.slot = self.name_index(node.name)
+            self.resolve_node(node.then_statement)
+        elif isinstance(node, ForConstRangeNode):
+            node.slot = self.name_index(node.variable)
+            for statement in node.body:
+                self.resolve_node(statement)
+        elif isinstance(node, PrintSingleVarNode):
+            node.slot = self.name_index(node.name)
+        elif isinstance(node, ReduceLoopNode):
+            self.resolve_node(node.loop)
+
+    def compile(self, program: List[ASTNode]) -> Bytecode:
+        self.resolve(program)
+        self.code = []
+        self.consts = []
+        line_starts = []
+
+        for node in program:
+            line_starts.append(len(self.code))
+            self.has_goto = False
+            self.compile_statement(node)
+            # GOTO only takes effect once its top-level statement finishes
+            if self.has_goto:
+                self.emit(OP_LINE_END)
+
+        return Bytecode(self.code, self.consts, self.names, line_starts)
+
+    def compile_statement(self, node: ASTNode) -> None:
+        self.compile_node(node)
+        # Standalone expressions are evaluated for their errors and discarded
+        if isinstance(node, EXPRESSION_NODES):
+            self.emit(OP_POP)
+
+    def compile_node(self, node: ASTNode) -> None:
+        self._dispatch[type(node)](node)
+
+    def compile_NumberNode(self, node: NumberNode) -> None:
+        self.emit(OP_LOAD_CONST, self.const_index(node.token.value))
+
+    def compile_StringNode(self, node: StringNode) -> None:
+        self.emit(OP_LOAD_CONST, self.const_index(node.token.value))
+
+    def compile_VariableNode(self, node: VariableNode) -> None:
+        self.emit(OP_LOAD_VAR, node.slot)
+
+    def compile_BinOpNode(self, node: BinOpNode) -> None:
+        # Every binary opcode calls the node's own operator function; a
+        # variable or literal operand is folded into the instruction
+        left, right = node.left, node.right
+        right_is_var = isinstance(right, VariableNode)
+        right_is_const = isinstance(right, (NumberNode, StringNode))
+
+        if isinstance(left, VariableNode) and (right_is_var or right_is_const):
+            op_fn = self.const_index(node.op_fn)
+            if right_is_var:
+                self.emit(OP_VAR_BINOP_VAR, left.slot, op_fn, right.slot)
+            else:
+                self.emit(OP_VAR_BINOP_CONST, left.slot, op_fn, self.const_index(right.token.value))
+            return
+
+        self.compile_node(left)
+        if right_is_var:
+            self.emit(OP_BINOP_VAR, self.const_index(node.op_fn), right.slot)
+        elif right_is_const:
+            self.emit(OP_BINOP_CONST, self.const_index(node.op_fn),
+                      self.const_index(right.token.value))
+        else:
+            self.compile_node(right)
+            self.emit(OP_BINOP, self.const_index(node.op_fn))
+
+    def compile_UnaryOpNode(self, node: UnaryOpNode) -> None:
+        self.compile_node(node.expr)
+        if node.op_token.value == '-':
+            self.emit(OP_NEG)
+        elif node.op_token.value != '+':
+            raise Exception(f'Unknown unary operator: {node.op_token.value}')
+
+    def compile_AssignNode(self, node: AssignNode) -> None:
+        self.compile_node(node.value)
+        self.emit(OP_STORE_VAR, node.slot)
+
+    def compile_PrintNode(self, node: PrintNode) -> None:
+        for expr in node.expressions:
+            self.compile_node(expr)
+        self.emit(OP_PRINT, len(node.expressions))
+
+    def compile_InputNode(self, node: InputNode) -> None:
+        for slot in node.slots:
+            self.emit(OP_INPUT, slot)
+
+    def compile_IfNode(self, node: IfNode) -> None:
+        self.compile_node(node.condition)
+        jump = self.emit(OP_JUMP_IF_FALSE, 0)
+        self.compile_statement(node.then_statement)
+        self.code[jump + 1] = len(self.code)
+
+    def compile_ForNode(self, node: ForNode) -> None:
+        self.compile_for_bounds(node)
+        self.compile_for_loop(node)
+
+    def compile_for_bounds(self, node: ForNode) -> None:
+        # start, end and step are evaluated once, before the loop variable
+        # is assigned; end and step then stay on the stack for the loop.
+        self.compile_node(node.start)
+        self.compile_node(node.end)
+        if node.step is None:
+            self.emit(OP_LOAD_CONST, self.const_index(1.0))
+        else:
+            self.compile_node(node.step)
+
+    def compile_for_loop(self, node: ForNode) -> None:
+        var = node.slot
+        self.emit(OP_FOR_INIT, var)
+
+        test = self.emit(OP_FOR_TEST, var, 0)
+        body = len(self.code)
+        for statement in node.body:
+            self.compile_statement(statement)
+        self.emit(OP_FOR_NEXT, var, body)
+        self.code[test + 2] = len(self.code)
+
+    def compile_IfCmpConstNode(self, node: IfCmpConstNode) -> None:
+        jump = self.emit(OP_IF_VAR_CMP_CONST, node.slot, self.const_index(node.const),
+                         self.const_index(node.cmp_fn), 0)
+        self.compile_statement(node.then_statement)
+        self.code[jump + 4] = len(self.code)
+
+    def compile_ForConstRangeNode(self, node: ForConstRangeNode) -> None:
+        # The bounds are known, so the entry test is decided here and the
+        # increment, bound check and back jump fuse into a single opcode.
+        self.emit(OP_LOAD_CONST, self.const_index(node.start))
+        self.emit(OP_STORE_VAR, node.slot)
+        step = node.step
+        if not ((step > 0 and node.start <= node.end) or (step < 0 and node.start >= node.end)):
+            return
+
+        body = len(self.code)
+        for statement in node.body:
+            self.compile_statement(statement)
+        self.emit(OP_FOR_UP_NEXT if step > 0 else OP_FOR_DOWN_NEXT,
+                  node.slot, self.const_index(step), self.const_index(node.end), body)
+
+    def compile_PrintSingleVarNode(self, node: PrintSingleVarNode) -> None:
+        self.emit(OP_PRINT_VAR, node.slot)
+
+    def compile_ReduceLoopNode(self, node: ReduceLoopNode) -> None:
+        # REDUCE skips the compiled loop when the reduction succeeds
+        loop = node.loop
+        if isinstance(loop, ForConstRangeNode):
+            reduce = self.emit(OP_REDUCE, self.const_index(node), 0)
+            self.compile_node(loop)
+        else:
+            # Otherwise the loop runs on the bounds REDUCE_FOR left on the stack
+            self.compile_for_bounds(loop)
+            reduce = self.emit(OP_REDUCE_FOR, self.const_index(node), 0)
+            self.compile_for_loop(loop)
+        self.code[reduce + 2] = len(self.code)
+
+    def compile_GotoNode(self, node: GotoNode) -> None:
+        self.has_goto = True
+        self.emit(OP_GOTO, node.line_number)
+
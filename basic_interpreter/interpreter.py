@@ -1,98 +1,205 @@
-from typing import Any, Dict, List, Optional
+import functools
+from collections.abc import MutableMapping
+from typing import Any, Iterator, List, Optional, Tuple, Union
 from .parser import (
     ASTNode, NumberNode, StringNode, VariableNode, BinOpNode,
     UnaryOpNode, AssignNode, PrintNode, InputNode, IfNode,
-    ForNode, GotoNode
+    ForNode, GotoNode, IfCmpConstNode, ForConstRangeNode, PrintSingleVarNode,
+    ReduceLoopNode, fold_constants, rewrite_superinstructions
 )
+from .compiler import Bytecode, Compiler, DispatchTable, compile_expr
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; reductions then run as plain loops
+    np = None
+
+_is_integer = float.is_integer
+
+@functools.lru_cache(maxsize=1024)
+def _format_integer(value: float) -> str:
+    return '%d' % value
+
+def format_value(value: Any, _isinstance=isinstance, _float=float,
+                 _is_integer=_is_integer, _str=str) -> str:
+    # Defaults bind the builtins as locals; PRINT calls this for every value
+    if _isinstance(value, _float) and _is_integer(value):
+        return _format_integer(value)
+    return _str(value)
+
+# Integer-valued floats below this add exactly in any order, which is what
+# lets a vectorized sum stand in for the loop's sequential one.
+_EXACT_LIMIT = 2.0 ** 53
+_REDUCE_CHUNK = 1 << 16
+
+def _is_exact_range(start: Any, end: Any, step: Any) -> bool:
+    """Whether a loop's values are integers that floats hold exactly."""
+    return (isinstance(start, float) and isinstance(end, float) and isinstance(step, float)
+            and _is_integer(start) and _is_integer(step)
+            and max(abs(start), abs(end), abs(step)) < _EXACT_LIMIT)
+
+def _trip_count(start: float, end: float, step: float) -> int:
+    if step > 0 and start <= end:
+        return int((end - start) // step) + 1
+    elif step < 0 and start >= end:
+        return int((start - end) // -step) + 1
+    return 0
+
+class VariableView(MutableMapping):
+    """Name-keyed view of an interpreter's variable slots.
+
+    Only variables that hold a value are present. Assigning a name that has
+    no slot yet gives it one, so values set here are seen by later programs.
+    """
+
+    def __init__(self, interpreter: 'Interpreter'):
+        self._interpreter = interpreter
+
+    def __getitem__(self, name: str) -> Any:
+        index = self._interpreter.compiler.var_index.get(name)
+        slots = self._interpreter.slots
+        if index is None or index >= len(slots) or slots[index] is None:
+            raise KeyError(name)
+        return slots[index]
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        index = self._interpreter.compiler.name_index(name)
+        self._interpreter.reserve_slots()[index] = value
+
+    def __delitem__(self, name: str) -> None:
+        self[name]  # KeyError if unset
+        self._interpreter.slots[self._interpreter.compiler.var_index[name]] = None
+
+    def __iter__(self) -> Iterator[str]:
+        for name, value in zip(self._interpreter.compiler.names, self._interpreter.slots):
+            if value is not None:
+                yield name
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
 
 class Interpreter:
     def __init__(self):
-        self.variables: Dict[str, Any] = {}
+        self.slots: List[Any] = []  # variable values by slot, None if unset
         self.program: List[ASTNode] = []
         self.current_line = 0
         self.input_fn = input  # Add configurable input function
+        self.compiler = Compiler()
+        self._dispatch = DispatchTable('visitor', {
+            NumberNode: self.visit_NumberNode,
+            StringNode: self.visit_StringNode,
+            VariableNode: self.visit_VariableNode,
+            BinOpNode: self.visit_BinOpNode,
+            UnaryOpNode: self.visit_UnaryOpNode,
+            AssignNode: self.visit_AssignNode,
+            PrintNode: self.visit_PrintNode,
+            InputNode: self.visit_InputNode,
+            IfNode: self.visit_IfNode,
+            ForNode: self.visit_ForNode,
+            GotoNode: self.visit_GotoNode,
+            IfCmpConstNode: self.visit_IfCmpConstNode,
+            ForConstRangeNode: self.visit_ForConstRangeNode,
+            PrintSingleVarNode: self.visit_PrintSingleVarNode,
+            ReduceLoopNode: self.visit_ReduceLoopNode,
+        })
+
+    @property
+    def variables(self) -> VariableView:
+        """The variables that currently hold a value; writes update the slots."""
+        return VariableView(self)
+
+    def reserve_slots(self) -> List[Any]:
+        slots = self.slots
+        if len(slots) < len(self.compiler.names):
+            slots.extend([None] * (len(self.compiler.names) - len(slots)))
+        return slots
 
-    def format_value(self, value: Any) -> str:
-        if isinstance(value, float) and value.is_integer():
-            return str(int(value))
-        return str(value)
+    format_value = staticmethod(format_value)  # kept for existing callers
 
     def visit(self, node: ASTNode) -> Any:
-        method_name = f'visit_{type(node).__name__}'
-        visitor = getattr(self, method_name, None)
-        if visitor is None:
-            raise Exception(f'No visitor found for {type(node).__name__}')
-        return visitor(node)
+        return self._dispatch[type(node)](node)
 
     def visit_NumberNode(self, node: NumberNode) -> float:
-        return float(node.token.value)
+        return node.token.value
 
     def visit_StringNode(self, node: StringNode) -> str:
-        return str(node.token.value)
+        return node.token.value
 
     def visit_VariableNode(self, node: VariableNode) -> Any:
-        var_name = node.token.value
-        if var_name not in self.variables:
-            raise Exception(f'Undefined variable: {var_name}')
-        return self.variables[var_name]
+        value = self.slots[node.slot]
+        if value is None:
+            raise Exception(f'Undefined variable: {node.token.value}')
+        return value
 
+    # Compound expressions are flattened once and evaluated iteratively
     def visit_BinOpNode(self, node: BinOpNode) -> float:
-        left = self.visit(node.left)
-        right = self.visit(node.right)
-        
-        if node.op_token.value == '+':
-            return left + right
-        elif node.op_token.value == '-':
-            return left - right
-        elif node.op_token.value == '*':
-            return left * right
-        elif node.op_token.value == '/':
-            if right == 0:
-                raise Exception('Division by zero')
-            return left / right
-        elif node.op_token.value in ['<', '>', '=', '<=', '>=', '<>']:
-            if node.op_token.value == '=':
-                return float(left == right)
-            elif node.op_token.value == '<':
-                return float(left < right)
-            elif node.op_token.value == '>':
-                return float(left > right)
-            elif node.op_token.value == '<=':
-                return float(left <= right)
-            elif node.op_token.value == '>=':
-                return float(left >= right)
-            elif node.op_token.value == '<>':
-                return float(left != right)
-        
-        raise Exception(f'Unknown operator: {node.op_token.value}')
+        code = node.code
+        if code is None:
+            code = node.code = compile_expr(node)
+        return self.eval_rpn(code)
 
     def visit_UnaryOpNode(self, node: UnaryOpNode) -> float:
-        value = self.visit(node.expr)
-        if node.op_token.value == '+':
-            return value
-        elif node.op_token.value == '-':
-            return -value
-        raise Exception(f'Unknown unary operator: {node.op_token.value}')
+        code = node.code
+        if code is None:
+            code = node.code = compile_expr(node)
+        return self.eval_rpn(code)
+
+    def eval_rpn(self, code: List[Any]) -> Any:
+        slots = self.slots
+        stack: List[Any] = []
+        push = stack.append
+        pop = stack.pop
+
+        for op, arg in code:
+            if op == 0:  # CONST
+                push(arg)
+            elif op == 1:  # LOAD
+                value = slots[arg]
+                if value is None:
+                    raise Exception(f'Undefined variable: {self.compiler.names[arg]}')
+                push(value)
+            elif op == 2:  # BINOP
+                right = pop()
+                stack[-1] = arg(stack[-1], right)
+            else:  # NEG
+                stack[-1] = -stack[-1]
+        return stack[0]
 
     def visit_AssignNode(self, node: AssignNode) -> None:
-        self.variables[node.name] = self.visit(node.value)
+        self.slots[node.slot] = self.visit(node.value)
 
     def visit_PrintNode(self, node: PrintNode) -> None:
-        values = []
-        for expr in node.expressions:
-            value = self.visit(expr)
-            values.append(self.format_value(value))
-        print(' '.join(values))
+        expressions = node.expressions
+        # print() already separates its arguments with a space
+        if len(expressions) == 1:
+            print(format_value(self.visit(expressions[0])))
+        elif len(expressions) == 2:
+            first = format_value(self.visit(expressions[0]))
+            print(first, format_value(self.visit(expressions[1])))
+        else:
+            print(' '.join([format_value(self.visit(expr)) for expr in expressions]))
+
+    def visit_PrintSingleVarNode(self, node: PrintSingleVarNode) -> None:
+        value = self.slots[node.slot]
+        if value is None:
+            raise Exception(f'Undefined variable: {node.name}')
+        print(format_value(value))
 
     def visit_InputNode(self, node: InputNode) -> None:
-        for var_name in node.variables:
-            value = self.input_fn(f"Enter value for {var_name}: ")
-            try:
-                # Try to convert to float if possible
-                self.variables[var_name] = float(value)
-            except ValueError:
-                # Otherwise store as string
-                self.variables[var_name] = value
+        for slot in node.slots:
+            self.read_input(slot)
+
+    def read_input(self, slot: int) -> None:
+        value = self.input_fn(f"Enter value for {self.compiler.names[slot]}: ")
+        try:
+            # Try to convert to float if possible
+            self.slots[slot] = float(value)
+        except ValueError:
+            # Otherwise store as string
+            self.slots[slot] = value
 
     def visit_IfNode(self, node: IfNode) -> None:
         condition = self.visit(node.condition)
@@ -100,26 +207,306 @@ class Interpreter:
             self.visit(node.then_statement)
 
     def visit_ForNode(self, node: ForNode) -> None:
+        self.run_for(node, *self.loop_bounds(node))
+
+    def loop_bounds(self, node: Union[ForNode, ForConstRangeNode]) -> Tuple[Any, Any, Any]:
+        """Evaluate a loop's start, end and step, in that order."""
+        if isinstance(node, ForConstRangeNode):
+            return node.start, node.end, node.step
         start_val = self.visit(node.start)
         end_val = self.visit(node.end)
-        step_val = 1 if node.step is None else self.visit(node.step)
-        
-        self.variables[node.variable] = start_val
-        
-        while ((step_val > 0 and self.variables[node.variable] <= end_val) or
-               (step_val < 0 and self.variables[node.variable] >= end_val)):
-            for statement in node.body:
-                self.visit(statement)
-            self.variables[node.variable] += step_val
+        step_val = 1.0 if node.step is None else self.visit(node.step)
+        return start_val, end_val, step_val
+
+    def run_for(self, node: Union[ForNode, ForConstRangeNode], start_val: Any,
+                end_val: Any, step_val: Any) -> None:
+        # The body's handlers are resolved once and cached on the node
+        body = node.bound_body(self._dispatch)
+        slots = self.slots
+        slot = node.slot
+        value = start_val
+
+        # If the body never touches the variable, the trip count is fixed up
+        # front and only the final value has to be stored
+        if not node.body_uses_variable() and _is_exact_range(start_val, end_val, step_val):
+            count = _trip_count(start_val, end_val, step_val)
+            done = 0
+            try:
+                for done in range(count):
+                    for handler, statement in body:
+                        handler(statement)
+                done = count
+            finally:
+                slots[slot] = start_val + done * step_val
+            return
+
+        if step_val > 0:
+            while value <= end_val:
+                slots[slot] = value
+                for handler, statement in body:
+                    handler(statement)
+                value = slots[slot] + step_val
+        elif step_val < 0:
+            while value >= end_val:
+                slots[slot] = value
+                for handler, statement in body:
+                    handler(statement)
+                value = slots[slot] + step_val
+        slots[slot] = value
+
+    def visit_ForConstRangeNode(self, node: ForConstRangeNode) -> None:
+        self.run_for(node, node.start, node.end, node.step)
+
+    def visit_IfCmpConstNode(self, node: IfCmpConstNode) -> None:
+        value = self.slots[node.slot]
+        if value is None:
+            raise Exception(f'Undefined variable: {node.name}')
+        if node.cmp_fn(value, node.const):
+            self.visit(node.then_statement)
+
+    def visit_ReduceLoopNode(self, node: ReduceLoopNode) -> None:
+        # The bounds are evaluated once and shared with the fallback loop
+        bounds = self.loop_bounds(node.loop)
+        if not self.reduce_loop(node, *bounds):
+            self.run_for(node.loop, *bounds)
+
+    def reduce_loop(self, node: ReduceLoopNode, start: Any, end: Any, step: Any) -> bool:
+        """Run the loop as a NumPy sum; returns False if it must run normally.
+
+        Only integer-valued starts, steps and terms are reduced, so the result
+        is bit-for-bit what the loop would compute. Nothing is assigned
+        unless the whole reduction succeeds.
+        """
+        if np is None:
+            return False
+
+        loop = node.loop
+        total = self.slots[node.accumulator.slot]
+        if not isinstance(total, float) or not _is_exact_range(start, end, step):
+            return False
+
+        count = _trip_count(start, end, step)
+        budget = _EXACT_LIMIT - abs(total)
+        reduced = 0.0
+        # Overflow and NaN only make the checks below fail, so they needn't warn
+        with np.errstate(all='ignore'):
+            for offset in range(0, count, _REDUCE_CHUNK):
+                values = start + step * np.arange(offset, min(offset + _REDUCE_CHUNK, count), dtype=float)
+                terms = self.vector_eval(node.term, loop.slot, values)
+                if terms is None:
+                    return False
+                terms = np.broadcast_to(terms, values.shape)
+                if not np.array_equal(terms, np.trunc(terms)):
+                    return False
+                budget -= float(np.abs(terms).sum())
+                if not budget > 0:
+                    return False
+                reduced += float(terms.sum())
+
+        if node.op_token.value == '-':
+            reduced = -reduced
+        self.slots[node.accumulator.slot] = total + reduced
+        self.slots[loop.slot] = start + count * step
+        return True
+
+    def vector_eval(self, node: ASTNode, loop_slot: int, values: Any) -> Any:
+        """Evaluate a loop-invariant term over all loop values at once."""
+        if isinstance(node, NumberNode):
+            return node.token.value
+        elif isinstance(node, VariableNode):
+            if node.slot == loop_slot:
+                return values
+            value = self.slots[node.slot]
+            return value if isinstance(value, float) else None
+        elif isinstance(node, UnaryOpNode):
+            operand = self.vector_eval(node.expr, loop_slot, values)
+            if operand is None or node.op_token.value == '+':
+                return operand
+            return -operand
+
+        left = self.vector_eval(node.left, loop_slot, values)
+        right = self.vector_eval(node.right, loop_slot, values)
+        if left is None or right is None:
+            return None
+        if node.op_token.value == '/':
+            # Let the loop itself raise the error at the right iteration
+            if np.any(right == 0):
+                return None
+            return left / right
+        return node.op_fn(left, right)
 
     def visit_GotoNode(self, node: GotoNode) -> None:
         self.current_line = node.line_number - 1  # Adjust for 0-based indexing
 
-    def interpret(self, program: List[ASTNode]) -> None:
-        self.program = program
+    def prepare(self, program: List[ASTNode]) -> List[ASTNode]:
+        """Apply the AST-level optimizations shared by walk() and interpret()."""
+        return rewrite_superinstructions(fold_constants(program))
+
+    def walk(self, program: List[ASTNode]) -> None:
+        """Run a program by walking the AST directly, without compiling it."""
+        self.program = self.prepare(program)
         self.current_line = 0
+        self.compiler.resolve(self.program)
+        self.reserve_slots()
         
         while self.current_line < len(self.program):
             node = self.program[self.current_line]
             self.visit(node)
-            self.current_line += 1
\ No newline at end of file
+            self.current_line += 1
+
+    def compile(self, program: List[ASTNode]) -> Bytecode:
+        """Prepare and compile a program so it can be run() any number of times."""
+        self.program = self.prepare(program)
+        return self.compiler.compile(self.program)
+
+    def interpret(self, program: List[ASTNode]) -> None:
+        bytecode = self.compile(program)
+        self.current_line = 0
+        self.run(bytecode)
+
+    def run(self, bytecode: Bytecode) -> None:
+        code = bytecode.code
+        consts = bytecode.consts
+        names = bytecode.names
+        line_starts = bytecode.line_starts
+        slots = self.reserve_slots()
+        stack: List[Any] = []
+        push = stack.append
+        pop = stack.pop
+        goto = None
+        pc = 0
+        end = len(code)
+
+        # Opcode values are inlined from compiler.py, most frequent first
+        while pc < end:
+            op = code[pc]
+            if op == 25:  # FOR_UP_NEXT
+                slot = code[pc + 1]
+                value = slots[slot] = slots[slot] + consts[code[pc + 2]]
+                pc = code[pc + 4] if value <= consts[code[pc + 3]] else pc + 5
+            elif op == 27:  # PRINT_VAR
+                value = slots[code[pc + 1]]
+                if value is None:
+                    raise Exception(f'Undefined variable: {names[code[pc + 1]]}')
+                print(format_value(value))
+                pc += 2
+            elif op == 29:  # VAR_BINOP_CONST
+                value = slots[code[pc + 1]]
+                if value is None:
+                    raise Exception(f'Undefined variable: {names[code[pc + 1]]}')
+                push(consts[code[pc + 2]](value, consts[code[pc + 3]]))
+                pc += 4
+            elif op == 2:  # STORE_VAR
+                slots[code[pc + 1]] = pop()
+                pc += 2
+            elif op == 24:  # IF_VAR_CMP_CONST
+                value = slots[code[pc + 1]]
+                if value is None:
+                    raise Exception(f'Undefined variable: {names[code[pc + 1]]}')
+                if consts[code[pc + 3]](value, consts[code[pc + 2]]):
+                    pc += 5
+                else:
+                    pc = code[pc + 4]
+            elif op == 0:  # LOAD_VAR
+                value = slots[code[pc + 1]]
+                if value is None:
+                    raise Exception(f'Undefined variable: {names[code[pc + 1]]}')
+                push(value)
+                pc += 2
+            elif op == 32:  # BINOP_CONST
+                stack[-1] = consts[code[pc + 1]](stack[-1], consts[code[pc + 2]])
+                pc += 3
+            elif op == 33:  # BINOP_VAR
+                value = slots[code[pc + 2]]
+                if value is None:
+                    raise Exception(f'Undefined variable: {names[code[pc + 2]]}')
+                stack[-1] = consts[code[pc + 1]](stack[-1], value)
+                pc += 3
+            elif op == 34:  # BINOP
+                right = pop()
+                stack[-1] = consts[code[pc + 1]](stack[-1], right)
+                pc += 2
+            elif op == 30:  # VAR_BINOP_VAR
+                left = slots[code[pc + 1]]
+                if left is None:
+                    raise Exception(f'Undefined variable: {names[code[pc + 1]]}')
+                right = slots[code[pc + 3]]
+                if right is None:
+                    raise Exception(f'Undefined variable: {names[code[pc + 3]]}')
+                push(consts[code[pc + 2]](left, right))
+                pc += 4
+            elif op == 31:  # FOR_NEXT
+                step = stack[-1]
+                value = slots[code[pc + 1]] + step
+                slots[code[pc + 1]] = value
+                if (step > 0 and value <= stack[-2]) or (step < 0 and value >= stack[-2]):
+                    pc = code[pc + 2]
+                else:
+                    del stack[-2:]
+                    pc += 3
+            elif op == 7:  # JUMP_IF_FALSE
+                pc = pc + 2 if pop() else code[pc + 1]
+            elif op == 1:  # LOAD_CONST
+                push(consts[code[pc + 1]])
+                pc += 2
+            elif op == 18:  # PRINT
+                count = code[pc + 1]
+                if count == 1:
+                    print(format_value(pop()))
+                elif count == 2:
+                    second = format_value(pop())
+                    print(format_value(pop()), second)
+                else:
+                    values = stack[-count:]
+                    del stack[-count:]
+                    print(' '.join([format_value(value) for value in values]))
+                pc += 2
+            elif op == 26:  # FOR_DOWN_NEXT
+                value = slots[code[pc + 1]] + consts[code[pc + 2]]
+                slots[code[pc + 1]] = value
+                pc = code[pc + 4] if value >= consts[code[pc + 3]] else pc + 5
+            elif op == 4:  # FOR_TEST
+                step = stack[-1]
+                value = slots[code[pc + 1]]
+                if (step > 0 and value <= stack[-2]) or (step < 0 and value >= stack[-2]):
+                    pc += 3
+                else:
+                    del stack[-2:]
+                    pc = code[pc + 2]
+            elif op == 20:  # FOR_INIT
+                slots[code[pc + 1]] = stack.pop(-3)
+                pc += 2
+            elif op == 19:  # POP
+                pop()
+                pc += 1
+            elif op == 23:  # LINE_END
+                if goto is None:
+                    pc += 1
+                else:
+                    # Mirror walk(): GOTO n resumes at statement index n
+                    pc = line_starts[goto] if goto < len(line_starts) else end
+                    goto = None
+            elif op == 22:  # GOTO
+                goto = code[pc + 1]
+                pc += 2
+            elif op == 21:  # INPUT
+                self.read_input(code[pc + 1])
+                pc += 2
+            elif op == 28:  # REDUCE
+                node = consts[code[pc + 1]]
+                loop = node.loop
+                if self.reduce_loop(node, loop.start, loop.end, loop.step):
+                    pc = code[pc + 2]
+                else:
+                    pc += 3
+            elif op == 35:  # REDUCE_FOR
+                if self.reduce_loop(consts[code[pc + 1]], stack[-3], stack[-2], stack[-1]):
+                    del stack[-3:]
+                    pc = code[pc + 2]
+                else:
+                    pc += 3
+            elif op == 17:  # NEG
+                stack[-1] = -stack[-1]
+                pc += 1
+            else:
+                raise Exception(f'Unknown opcode: {op}')
@@ -1,5 +1,7 @@
+import re
 from enum import Enum, auto
 from dataclasses import dataclass
+from typing import Iterator, List, Optional
 
 class TokenType(Enum):
     NUMBER = auto()
@@ -10,12 +12,23 @@ class TokenType(Enum):
     EOL = auto()
     EOF = auto()
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     type: TokenType
     value: str
-    line: int
-    column: int
+    pos: int  # offset into the source; see Lexer.position()
+
+# One alternative per token kind; scan() demultiplexes on m.lastindex
+_TOKEN_RE = re.compile(r'''
+    (\d+(?:\.\d*)?)              # 1: number
+  | "([^"]*)"                    # 2: string
+  | ('[^\n]*|(?i:REM)\b[^\n]*)   # 3: comment, tried before identifiers
+  | ([^\W\d_]\w*)                # 4: identifier or keyword, if it starts isalpha()
+  | (<=|<>|>=|[-+*/()=<>,:;])    # 5: operator
+  | (\n)                         # 6: end of line
+  | ([^\S\n]+)                   # 7: whitespace
+  | (.)                          # 8: invalid character
+''', re.VERBOSE)
 
 class Lexer:
     KEYWORDS = {
@@ -24,145 +37,78 @@ class Lexer:
         'REM', 'RANDOM', 'RND'
     }
 
-    COMPOUND_OPERATORS = {
-        '<': ['<=', '<>', '<'],
-        '>': ['>=', '>'],
-        '=': ['=']
+    OPERATORS = '+-*/()=<>,:;'
+
+    # Keywords and operators are shared, immutable-by-convention singletons.
+    # They don't carry a source position; nothing downstream relies on one.
+    _KEYWORD_TOKENS = {kw: Token(TokenType.KEYWORD, kw, 0) for kw in KEYWORDS}
+    _OP_TOKENS = {
+        op: Token(TokenType.OPERATOR, op, 0)
+        for op in [*OPERATORS, '<=', '<>', '>=']
     }
 
     def __init__(self, text: str):
         self.text = text
         self.pos = 0
-        self.current_char = self.text[0] if text else None
-        self.line = 1
-        self.column = 1
-
-    def error(self):
-        raise Exception(f'Invalid character at line {self.line}, column {self.column}')
-
-    def advance(self):
-        self.pos += 1
-        self.column += 1
-        self.current_char = self.text[self.pos] if self.pos < len(self.text) else None
-
-    def peek(self):
-        peek_pos = self.pos + 1
-        return self.text[peek_pos] if peek_pos < len(self.text) else None
-
-    def skip_whitespace(self):
-        while self.current_char and self.current_char.isspace() and self.current_char != '\n':
-            self.advance()
-
-    def skip_comment(self):
-        while self.current_char and self.current_char != '\n':
-            self.advance()
-
-    def number(self):
-        result = ''
-        start_column = self.column
-
-        while self.current_char and (self.current_char.isdigit() or self.current_char == '.'):
-            result += self.current_char
-            self.advance()
-
-        try:
-            return Token(TokenType.NUMBER, float(result), self.line, start_column)
-        except ValueError:
-            self.error()
-
-    def string(self):
-        result = ''
-        start_column = self.column
-        self.advance()  # Skip opening quote
-
-        while self.current_char and self.current_char != '"':
-            result += self.current_char
-            self.advance()
-
-        if self.current_char == '"':
-            self.advance()  # Skip closing quote
-            return Token(TokenType.STRING, result, self.line, start_column)
-        else:
-            self.error()
-
-    def identifier(self):
-        result = ''
-        start_column = self.column
-
-        while self.current_char and (self.current_char.isalnum() or self.current_char == '_'):
-            result += self.current_char
-            self.advance()
-
-        token_type = TokenType.KEYWORD if result.upper() in self.KEYWORDS else TokenType.IDENTIFIER
-        return Token(token_type, result.upper(), self.line, start_column)
-
-    def handle_operator(self) -> Token:
-        start_char = self.current_char
-        column = self.column
-        
-        if start_char in self.COMPOUND_OPERATORS:
-            current = start_char
-            self.advance()
-            
-            # Try to form a compound operator
-            if self.current_char:
-                potential = current + self.current_char
-                for op in self.COMPOUND_OPERATORS[start_char]:
-                    if op == potential:
-                        self.advance()
-                        return Token(TokenType.OPERATOR, op, self.line, column)
-            
-            # If no compound operator matches, return the single char operator
-            return Token(TokenType.OPERATOR, current, self.line, column)
-        else:
-            # Handle single-char operators
-            self.advance()
-            return Token(TokenType.OPERATOR, start_char, self.line, column)
-
-    def get_next_token(self):
-        while self.current_char:
-            # Skip whitespace
-            if self.current_char.isspace() and self.current_char != '\n':
-                self.skip_whitespace()
-                continue
-
-            # Handle new lines
-            if self.current_char == '\n':
-                self.line += 1
-                self.column = 0
-                self.advance()
-                return Token(TokenType.EOL, '\n', self.line - 1, self.column)
-
-            # Handle numbers
-            if self.current_char.isdigit():
-                return self.number()
+        self._scanner: Optional[Iterator[Token]] = None  # behind get_next_token()
 
-            # Handle strings
-            if self.current_char == '"':
-                return self.string()
+    def position(self, pos: int):
+        """Line and column of offset `pos`, only worked out when reporting errors."""
+        line = self.text.count('\n', 0, pos) + 1
+        column = pos - (self.text.rfind('\n', 0, pos) + 1) + 1
+        return line, column
 
-            # Handle identifiers and keywords
-            if self.current_char.isalpha():
-                return self.identifier()
-
-            # Handle comments
-            if self.current_char == "'" or (self.current_char == 'R' and self.peek() == 'E'):
-                self.skip_comment()
+    def error(self):
+        line, column = self.position(self.pos)
+        raise Exception(f'Invalid character at line {line}, column {column}')
+
+    def offsets(self) -> List[int]:
+        """Source offset of each token tokenize() returns, shared ones included.
+
+        Shared tokens all carry offset 0, so this scans the text again; it is
+        only used to locate syntax errors.
+        """
+        return [m.start() for m in _TOKEN_RE.finditer(self.text)
+                if m.lastindex != 3 and m.lastindex != 7] + [len(self.text)]
+
+    def get_next_token(self) -> Token:
+        """Return tokens one at a time; EOF repeats once the input is used up."""
+        if self._scanner is None:
+            self._scanner = self.scan()
+        token = next(self._scanner, None)
+        return token if token is not None else Token(TokenType.EOF, '', len(self.text))
+
+    def tokenize(self) -> List[Token]:
+        return list(self.scan())
+
+    def scan(self) -> Iterator[Token]:
+        keyword_tokens = self._KEYWORD_TOKENS
+        op_tokens = self._OP_TOKENS
+
+        for m in _TOKEN_RE.finditer(self.text):
+            kind = m.lastindex
+            if kind == 4:
+                value = m.group(4)
+                # \w also admits numeric characters such as '²' up front
+                if not value[0].isalpha():
+                    self.pos = m.start()
+                    self.error()
+                value = value.upper()
+                token = keyword_tokens.get(value)
+                yield token if token is not None else Token(TokenType.IDENTIFIER, value, m.start())
+            elif kind == 5:
+                yield op_tokens[m.group(5)]
+            elif kind == 7 or kind == 3:
                 continue
-
-            # Handle operators
-            if self.current_char in '+-*/()=<>,:;':
-                return self.handle_operator()
-
-            self.error()
-
-        return Token(TokenType.EOF, '', self.line, self.column)
-
-    def tokenize(self):
-        tokens = []
-        while True:
-            token = self.get_next_token()
-            tokens.append(token)
-            if token.type == TokenType.EOF:
-                break
-        return tokens
\ No newline at end of file
+            elif kind == 1:
+                yield Token(TokenType.NUMBER, float(m.group(1)), m.start())
+            elif kind == 6:
+                yield Token(TokenType.EOL, '\n', m.start())
+            elif kind == 2:
+                yield Token(TokenType.STRING, m.group(2), m.start())
+            else:
+                self.pos = m.start()
+                self.error()
+
+        self.pos = len(self.text)
+        yield Token(TokenType.EOF, '', self.pos)
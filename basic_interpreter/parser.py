@@ -1,72 +1,222 @@
-from dataclasses import dataclass
-from typing import List, Union, Optional
-from .lexer import Token, TokenType
+import operator
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Mapping, Tuple, Union, Optional
+from .lexer import Lexer, Token, TokenType
+
+def _safe_div(left, right):
+    if right == 0:
+        raise Exception('Division by zero')
+    return left / right
+
+# Binary operator semantics, bound onto each BinOpNode as it is built
+_BINOPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': _safe_div,
+    '=': lambda left, right: float(left == right),
+    '<>': lambda left, right: float(left != right),
+    '<': lambda left, right: float(left < right),
+    '>': lambda left, right: float(left > right),
+    '<=': lambda left, right: float(left <= right),
+    '>=': lambda left, right: float(left >= right),
+}
+
+# Plain comparisons for fused IF statements, which only need truthiness
+_COMPARISONS = {
+    '=': operator.eq,
+    '<>': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
 
 # AST Node classes
-@dataclass
+@dataclass(slots=True)
 class NumberNode:
     token: Token
 
-@dataclass
+    def __post_init__(self):
+        # The lexer already converts literals, so visitors use the value as-is
+        if not isinstance(self.token.value, float):
+            raise Exception(f'Invalid number literal: {self.token.value!r}')
+
+@dataclass(slots=True)
 class StringNode:
     token: Token
 
-@dataclass
+@dataclass(slots=True)
 class VariableNode:
     token: Token
+    slot: Optional[int] = field(default=None, repr=False, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class BinOpNode:
     left: 'ASTNode'
     op_token: Token
     right: 'ASTNode'
+    op_fn: Callable[[Any, Any], Any] = field(init=False, repr=False, compare=False)
+    code: Optional[list] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        op_fn = _BINOPS.get(self.op_token.value)
+        if op_fn is None:
+            raise Exception(f'Unknown operator: {self.op_token.value}')
+        self.op_fn = op_fn
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOpNode:
     op_token: Token
     expr: 'ASTNode'
+    code: Optional[list] = field(default=None, init=False, repr=False, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class AssignNode:
     name: str
     value: 'ASTNode'
+    slot: Optional[int] = field(default=None, repr=False, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class PrintNode:
     expressions: List['ASTNode']
 
-@dataclass
+@dataclass(slots=True)
 class InputNode:
     variables: List[str]
+    slots: List[int] = field(default_factory=list, repr=False, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class IfNode:
     condition: 'ASTNode'
     then_statement: 'ASTNode'
 
-@dataclass
-class ForNode:
+class LoopBody:
+    """Mixin for loop nodes: caches the body's (handler, statement) pairs.
+
+    The pairs are bound to one interpreter's dispatch table, so they are
+    rebuilt if a different interpreter runs the same node.
+    """
+    __slots__ = ()
+
+    def bound_body(self, dispatch: Mapping[type, Callable]) -> List[Tuple[Callable, 'ASTNode']]:
+        compiled = self._compiled
+        if compiled is None or compiled[0] is not dispatch:
+            compiled = self._compiled = (dispatch, [(dispatch[type(statement)], statement)
+                                                    for statement in self.body])
+        return compiled[1]
+
+    def body_uses_variable(self) -> bool:
+        """Whether any statement in the body reads or writes the loop variable."""
+        uses = self._uses_variable
+        if uses is None:
+            uses = self._uses_variable = any(references(statement, self.variable)
+                                             for statement in self.body)
+        return uses
+
+@dataclass(slots=True)
+class ForNode(LoopBody):
     variable: str
     start: 'ASTNode'
     end: 'ASTNode'
     step: Optional['ASTNode']
     body: List['ASTNode']
+    slot: Optional[int] = field(default=None, repr=False, compare=False)
+    _compiled: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _uses_variable: Optional[bool] = field(default=None, init=False, repr=False, compare=False)
 
-@dataclass
+@dataclass(slots=True)
 class GotoNode:
     line_number: int
 
+# Fused nodes, produced by rewrite_superinstructions() rather than the parser
+@dataclass(slots=True)
+class IfCmpConstNode:
+    """IF <variable> <relational op> <number> THEN <statement>"""
+    name: str
+    op_token: Token
+    const: float
+    then_statement: 'ASTNode'
+    cmp_fn: Callable[[Any, Any], bool] = field(init=False, repr=False, compare=False)
+    slot: Optional[int] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.cmp_fn = _COMPARISONS[self.op_token.value]
+
+@dataclass(slots=True)
+class ForConstRangeNode(LoopBody):
+    """FOR loop whose start, end and step are all number literals"""
+    variable: str
+    start: float
+    end: float
+    step: float
+    body: List['ASTNode']
+    slot: Optional[int] = field(default=None, repr=False, compare=False)
+    _compiled: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _uses_variable: Optional[bool] = field(default=None, init=False, repr=False, compare=False)
+
+@dataclass(slots=True)
+class PrintSingleVarNode:
+    """PRINT <variable>"""
+    name: str
+    slot: Optional[int] = field(default=None, repr=False, compare=False)
+
+@dataclass(slots=True)
+class ReduceLoopNode:
+    """FOR loop whose whole body is LET <acc> = <acc> +/- <term>
+
+    The interpreter may compute the loop as a single vectorized sum; `loop`
+    is the unchanged loop, run instead whenever that isn't safe.
+    """
+    loop: 'ASTNode'
+    accumulator: AssignNode
+    op_token: Token
+    term: 'ASTNode'
+
 ASTNode = Union[NumberNode, StringNode, VariableNode, BinOpNode, UnaryOpNode,
-                AssignNode, PrintNode, InputNode, IfNode, ForNode, GotoNode]
+                AssignNode, PrintNode, InputNode, IfNode, ForNode, GotoNode,
+                IfCmpConstNode, ForConstRangeNode, PrintSingleVarNode,
+                ReduceLoopNode]
 
 class Parser:
-    def __init__(self, tokens: List[Token]):
+    def __init__(self, tokens: List[Token], text: Optional[str] = None):
         self.tokens = tokens
+        self.text = text  # the source, only read to locate syntax errors
         self.pos = 0
         self.current_token = tokens[0] if tokens else None
 
+    def position(self) -> Tuple[int, Optional[int]]:
+        """Line and column of the current token; the column is None if unknown.
+
+        Keyword and operator tokens are shared and carry no offset of their
+        own. With the source text, their offset is found by scanning it
+        again; without it, only their line is known.
+        """
+        index = min(self.pos, len(self.tokens) - 1)
+        if self.text is not None:
+            lexer = Lexer(self.text)
+            offsets = lexer.offsets()
+            if index < len(offsets):
+                return lexer.position(offsets[index])
+
+        line, line_start = 1, 0
+        for token in self.tokens[:index]:
+            if token.type == TokenType.EOL:
+                line += 1
+                line_start = token.pos + 1
+        token = self.tokens[index]
+        if token.type == TokenType.KEYWORD or token.type == TokenType.OPERATOR:
+            return line, None
+        return line, token.pos - line_start + 1
+
     def error(self):
-        raise Exception(f'Invalid syntax at {self.current_token}')
+        token = self.current_token
+        if not self.tokens:
+            raise Exception('Invalid syntax: no tokens')
+        found = 'end of input' if token is None or token.type == TokenType.EOF else repr(token.value)
+        line, column = self.position()
+        where = f'line {line}' if column is None else f'line {line}, column {column}'
+        raise Exception(f'Invalid syntax at {where}: unexpected {found}')
 
     def advance(self):
         self.pos += 1
@@ -210,10 +360,10 @@ class Parser:
     def number_from_unary(self, node: ASTNode) -> NumberNode:
         """Convert a UnaryOpNode with a NumberNode to a single NumberNode with the sign applied"""
         if isinstance(node, UnaryOpNode) and isinstance(node.expr, NumberNode):
-            value = float(node.expr.token.value)
+            value = node.expr.token.value
             if node.op_token.value == '-':
                 value = -value
-            return NumberNode(Token(TokenType.NUMBER, value, node.op_token.line, node.op_token.column))
+            return NumberNode(Token(TokenType.NUMBER, value, node.op_token.pos))
         return node
 
     def for_statement(self) -> ForNode:
@@ -268,4 +418,134 @@ class Parser:
             if stmt:
                 statements.append(stmt)
                 
-        return statements
\ No newline at end of file
+        return statements
+
+def fold_constants(program: List[ASTNode]) -> List[ASTNode]:
+    """Replace arithmetic on number literals with the precomputed literal.
+
+    This runs after Parser.parse(), which keeps returning the tree exactly
+    as written. Subtrees that would fail to evaluate (division by zero)
+    are left alone so the error is still raised at run time, if reached.
+    """
+    return [_fold(node) for node in program]
+
+def _fold(node: ASTNode) -> ASTNode:
+    if isinstance(node, BinOpNode):
+        left = _fold(node.left)
+        right = _fold(node.right)
+        if isinstance(left, NumberNode) and isinstance(right, NumberNode):
+            try:
+                value = node.op_fn(left.token.value, right.token.value)
+            except Exception:
+                pass
+            else:
+                return NumberNode(Token(TokenType.NUMBER, value, left.token.pos))
+        if left is node.left and right is node.right:
+            return node
+        return BinOpNode(left, node.op_token, right)
+    elif isinstance(node, UnaryOpNode):
+        expr = _fold(node.expr)
+        if isinstance(expr, NumberNode):
+            value = -expr.token.value if node.op_token.value == '-' else expr.token.value
+            return NumberNode(Token(TokenType.NUMBER, value, expr.token.pos))
+        return node if expr is node.expr else UnaryOpNode(node.op_token, expr)
+    elif isinstance(node, AssignNode):
+        return AssignNode(node.name, _fold(node.value))
+    elif isinstance(node, PrintNode):
+        return PrintNode([_fold(expr) for expr in node.expressions])
+    elif isinstance(node, IfNode):
+        return IfNode(_fold(node.condition), _fold(node.then_statement))
+    elif isinstance(node, ForNode):
+        step = None if node.step is None else _fold(node.step)
+        return ForNode(node.variable, _fold(node.start), _fold(node.end), step,
+                       [_fold(statement) for statement in node.body])
+    return node
+
+def references(node: ASTNode, name: str) -> bool:
+    """Whether `node` or anything nested in it reads or assigns variable `name`."""
+    if isinstance(node, VariableNode):
+        return node.token.value == name
+    elif isinstance(node, BinOpNode):
+        return references(node.left, name) or references(node.right, name)
+    elif isinstance(node, UnaryOpNode):
+        return references(node.expr, name)
+    elif isinstance(node, AssignNode):
+        return node.name == name or references(node.value, name)
+    elif isinstance(node, PrintNode):
+        return any(references(expr, name) for expr in node.expressions)
+    elif isinstance(node, InputNode):
+        return name in node.variables
+    elif isinstance(node, IfNode):
+        return references(node.condition, name) or references(node.then_statement, name)
+    elif isinstance(node, IfCmpConstNode):
+        return node.name == name or references(node.then_statement, name)
+    elif isinstance(node, PrintSingleVarNode):
+        return node.name == name
+    elif isinstance(node, (ForNode, ForConstRangeNode)):
+        if node.variable == name or any(references(statement, name) for statement in node.body):
+            return True
+        if isinstance(node, ForNode):
+            return any(references(expr, name) for expr in (node.start, node.end, node.step)
+                       if expr is not None)
+        return False
+    elif isinstance(node, ReduceLoopNode):
+        return references(node.loop, name)
+    return False
+
+def rewrite_superinstructions(program: List[ASTNode]) -> List[ASTNode]:
+    """Replace common statement shapes with fused nodes that run in one step.
+
+    Expects constants to be folded already, so that e.g. STEP -1 or
+    TO 2 * 5 arrive as plain NumberNodes.
+    """
+    return [_rewrite(node) for node in program]
+
+def _rewrite(node: ASTNode) -> ASTNode:
+    if isinstance(node, PrintNode):
+        if len(node.expressions) == 1 and isinstance(node.expressions[0], VariableNode):
+            return PrintSingleVarNode(node.expressions[0].token.value)
+        return node
+    elif isinstance(node, IfNode):
+        then_statement = _rewrite(node.then_statement)
+        condition = node.condition
+        if isinstance(condition, BinOpNode) and condition.op_token.value in _COMPARISONS and \
+           isinstance(condition.left, VariableNode) and isinstance(condition.right, NumberNode):
+            return IfCmpConstNode(condition.left.token.value, condition.op_token,
+                                  condition.right.token.value, then_statement)
+        return IfNode(condition, then_statement)
+    elif isinstance(node, ForNode):
+        body = [_rewrite(statement) for statement in node.body]
+        if isinstance(node.start, NumberNode) and isinstance(node.end, NumberNode) and \
+           (node.step is None or isinstance(node.step, NumberNode)):
+            step = 1.0 if node.step is None else node.step.token.value
+            loop = ForConstRangeNode(node.variable, node.start.token.value,
+                                     node.end.token.value, step, body)
+        else:
+            loop = ForNode(node.variable, node.start, node.end, node.step, body)
+        return _as_reduction(loop) or loop
+    return node
+
+def _as_reduction(loop: Union[ForNode, ForConstRangeNode]) -> Optional[ReduceLoopNode]:
+    if len(loop.body) != 1 or not isinstance(loop.body[0], AssignNode):
+        return None
+    assign = loop.body[0]
+    value = assign.value
+    if not (isinstance(value, BinOpNode) and value.op_token.value in ('+', '-') and
+            isinstance(value.left, VariableNode) and value.left.token.value == assign.name):
+        return None
+    if assign.name == loop.variable or not _is_numeric_term(value.right, assign.name):
+        return None
+    return ReduceLoopNode(loop, assign, value.op_token, value.right)
+
+def _is_numeric_term(node: ASTNode, accumulator: str) -> bool:
+    """Arithmetic on numbers and variables other than the accumulator"""
+    if isinstance(node, NumberNode):
+        return True
+    elif isinstance(node, VariableNode):
+        return node.token.value != accumulator
+    elif isinstance(node, UnaryOpNode):
+        return _is_numeric_term(node.expr, accumulator)
+    elif isinstance(node, BinOpNode):
+        return node.op_token.value in ('+', '-', '*', '/') and \
+            _is_numeric_term(node.left, accumulator) and _is_numeric_term(node.right, accumulator)
+    return False
@@ -0,0 +1,148 @@
+from ..lexer import Lexer
+from ..parser import Parser, fold_constants, rewrite_superinstructions
+from ..compiler import (
+    Compiler, OP_LOAD_CONST, OP_LOAD_VAR, OP_STORE_VAR, OP_BINOP,
+    OP_JUMP_IF_FALSE, OP_PRINT, OP_POP, OP_FOR_INIT, OP_FOR_TEST,
+    OP_FOR_NEXT, OP_GOTO, OP_LINE_END, OP_IF_VAR_CMP_CONST, OP_VAR_BINOP_CONST,
+    OP_VAR_BINOP_VAR, OP_BINOP_CONST, OP_BINOP_VAR, OP_FOR_UP_NEXT,
+    OP_FOR_DOWN_NEXT, OP_PRINT_VAR, OP_REDUCE_FOR, RPN_CONST, RPN_LOAD,
+    RPN_BINOP, RPN_NEG, compile_expr
+)
+import operator
+
+def compile_code(code: str, compiler=None, optimize=False):
+    lexer = Lexer(code)
+    tokens = lexer.tokenize()
+    parser = Parser(tokens)
+    ast = parser.parse()
+    if optimize:
+        ast = rewrite_superinstructions(fold_constants(ast))
+    compiler = compiler or Compiler()
+    return compiler.compile(ast)
+
+def test_assignment():
+    bytecode = compile_code('LET X = 2 + Y * 3')
+    assert bytecode.code == [
+        OP_LOAD_CONST, 0, OP_VAR_BINOP_CONST, 0, 1, 2, OP_BINOP, 3, OP_STORE_VAR, 1,
+    ]
+    assert bytecode.consts == [2.0, operator.mul, 3.0, operator.add]
+    assert bytecode.names == ['Y', 'X']
+
+def test_operands_fuse_into_operators():
+    bytecode = compile_code('LET R = (A + B) * (A - 1)')
+    assert bytecode.code == [
+        OP_VAR_BINOP_VAR, 0, 0, 1, OP_VAR_BINOP_CONST, 0, 1, 2, OP_BINOP, 3,
+        OP_STORE_VAR, 2,
+    ]
+    assert bytecode.consts == [operator.add, operator.sub, 1.0, operator.mul]
+
+    bytecode = compile_code('LET R = 2 * A - B + 1')
+    assert bytecode.code == [
+        OP_LOAD_CONST, 0, OP_BINOP_VAR, 1, 0, OP_BINOP_VAR, 2, 1,
+        OP_BINOP_CONST, 3, 4, OP_STORE_VAR, 2,
+    ]
+    assert bytecode.consts == [2.0, operator.mul, operator.sub, operator.add, 1.0]
+
+def test_expression_statement_is_popped():
+    bytecode = compile_code('42')
+    assert bytecode.code == [OP_LOAD_CONST, 0, OP_POP]
+
+def test_if_jumps_past_then_statement():
+    bytecode = compile_code('IF X > 5 THEN PRINT X')
+    assert bytecode.code == [
+        OP_VAR_BINOP_CONST, 0, 0, 1, OP_JUMP_IF_FALSE, 10, OP_LOAD_VAR, 0,
+        OP_PRINT, 1,
+    ]
+
+def test_for_loop():
+    bytecode = compile_code('''
+    FOR I = 1 TO 3
+    PRINT I
+    NEXT
+    ''')
+    assert bytecode.code == [
+        OP_LOAD_CONST, 0, OP_LOAD_CONST, 1, OP_LOAD_CONST, 2, OP_FOR_INIT, 0,
+        OP_FOR_TEST, 0, 18, OP_LOAD_VAR, 0, OP_PRINT, 1, OP_FOR_NEXT, 0, 11,
+    ]
+    assert bytecode.consts == [1.0, 3.0, 1.0]
+
+def test_goto_ends_its_statement():
+    bytecode = compile_code('''
+    PRINT 1
+    GOTO 0
+    ''')
+    assert bytecode.code == [OP_LOAD_CONST, 0, OP_PRINT, 1, OP_GOTO, 0, OP_LINE_END]
+    assert bytecode.line_starts == [0, 4]
+
+def test_names_shared_across_compiles():
+    compiler = Compiler()
+    compile_code('LET X = 1', compiler)
+    bytecode = compile_code('LET Y = X', compiler)
+    assert bytecode.names == ['X', 'Y']
+    assert compiler.var_index == {'X': 0, 'Y': 1}
+
+def test_resolve_assigns_slots():
+    compiler = Compiler()
+    ast = Parser(Lexer('''
+    INPUT A, B
+    FOR I = A TO B
+    LET S = S + I
+    NEXT
+    ''').tokenize()).parse()
+    compiler.resolve(ast)
+    assert ast[0].slots == [0, 1]
+    assert ast[1].slot == 2
+    assert ast[1].start.slot == 0
+    assert ast[1].body[0].value.left.slot == 3
+    assert ast[1].body[0].slot == 3
+    assert compiler.names == ['A', 'B', 'I', 'S']
+
+def test_fused_if():
+    bytecode = compile_code('IF X > 5 THEN PRINT X', optimize=True)
+    assert bytecode.code == [OP_IF_VAR_CMP_CONST, 0, 0, 1, 7, OP_PRINT_VAR, 0]
+    assert bytecode.consts[0] == 5.0
+
+def test_fused_for_loop():
+    bytecode = compile_code('''
+    FOR I = 1 TO 3
+    PRINT I
+    NEXT
+    ''', optimize=True)
+    assert bytecode.code == [
+        OP_LOAD_CONST, 0, OP_STORE_VAR, 0, OP_PRINT_VAR, 0,
+        OP_FOR_UP_NEXT, 0, 1, 2, 4,
+    ]
+    assert bytecode.consts == [1.0, 1.0, 3.0]
+
+    bytecode = compile_code('''
+    FOR I = 3 TO 1 STEP -1
+    NEXT
+    ''', optimize=True)
+    assert bytecode.code == [OP_LOAD_CONST, 0, OP_STORE_VAR, 0, OP_FOR_DOWN_NEXT, 0, 1, 2, 4]
+
+def test_fused_for_loop_that_never_runs():
+    bytecode = compile_code('''
+    FOR I = 1 TO 0
+    PRINT I
+    NEXT
+    ''', optimize=True)
+    assert bytecode.code == [OP_LOAD_CONST, 0, OP_STORE_VAR, 0]
+
+def test_reduction_shares_loop_bounds():
+    bytecode = compile_code('''
+    FOR I = 1 TO N
+    LET S = S + I
+    NEXT
+    ''', optimize=True)
+    assert bytecode.code[:11] == [
+        OP_LOAD_CONST, 0, OP_LOAD_VAR, 1, OP_LOAD_CONST, 1, OP_REDUCE_FOR, 2,
+        len(bytecode.code), OP_FOR_INIT, 0,
+    ]
+
+def test_compile_expr_is_postorder():
+    ast = Parser(Lexer('LET Y = -(X + 2) * 3').tokenize()).parse()
+    compiler = Compiler()
+    compiler.resolve(ast)
+    code = compile_expr(ast[0].value)
+    assert code == [(RPN_LOAD, 0), (RPN_CONST, 2.0), (RPN_BINOP, operator.add),
+                    (RPN_NEG, None), (RPN_CONST, 3.0), (RPN_BINOP, operator.mul)]
@@ -1,11 +1,13 @@
 import pytest
 from io import StringIO
 import sys
+import warnings
 from ..lexer import Lexer
 from ..parser import Parser
-from ..interpreter import Interpreter
+from ..interpreter import Interpreter, format_value
+from ..basic import Basic
 
-def run_basic(code: str, input_values=None):
+def run_basic(code: str, input_values=None, walk=False):
     # Set up input simulation if provided
     if input_values:
         input_iter = iter(input_values)
@@ -26,7 +28,10 @@ def run_basic(code: str, input_values=None):
         interpreter = Interpreter()
         # Set the mock input function
         interpreter.input_fn = input_mock
-        interpreter.interpret(ast)
+        if walk:
+            interpreter.walk(ast)
+        else:
+            interpreter.interpret(ast)
         
         return stdout.getvalue().strip()
     finally:
@@ -85,4 +90,268 @@ def test_complex_program():
     NEXT
     PRINT "Factorial of", N, "is:", FACT
     '''
-    assert run_basic(program) == 'Factorial of 5 is: 120'
\ No newline at end of file
+    assert run_basic(program) == 'Factorial of 5 is: 120'
+
+def test_for_loop_with_negative_step():
+    program = '''
+    FOR X = 10 TO 0 STEP -2
+    PRINT X
+    NEXT
+    PRINT X
+    '''
+    assert run_basic(program).split() == ['10', '8', '6', '4', '2', '0', '-2']
+
+def test_rem_comment():
+    program = '''
+    REM compute a result
+    LET RESULT = 6 * 7 REM the answer
+    PRINT RESULT
+    '''
+    assert run_basic(program) == '42'
+
+def test_goto_skips_statements():
+    program = '''
+    LET X = 1
+    GOTO 3
+    LET X = 2
+    PRINT X
+    '''
+    assert run_basic(program) == '1'
+
+def test_variables_persist_across_programs():
+    interpreter = Interpreter()
+    interpreter.interpret(Parser(Lexer('LET X = 2').tokenize()).parse())
+    interpreter.walk(Parser(Lexer('LET Y = X * 3').tokenize()).parse())
+    interpreter.interpret(Parser(Lexer('LET X = Y + 1').tokenize()).parse())
+    assert interpreter.variables == {'X': 7.0, 'Y': 6.0}
+
+def test_reduction_loop():
+    program = '''
+    LET S = 0
+    FOR I = 1 TO 100000
+    LET S = S + I
+    NEXT
+    PRINT S, I
+    '''
+    assert run_basic(program) == '5000050000 100001'
+
+def test_reduction_loop_raises_inside_loop():
+    program = '''
+    LET S = 0
+    FOR I = -2 TO 2
+    LET S = S + 1 / I
+    NEXT
+    '''
+    with pytest.raises(Exception, match='Division by zero'):
+        run_basic(program)
+
+def test_reduction_loop_uses_numpy():
+    pytest.importorskip('numpy')
+    interpreter = Interpreter()
+    ast = interpreter.prepare(Parser(Lexer('''
+    FOR I = 1 TO 10 STEP 2
+    LET S = S + 3 * I
+    NEXT
+    ''').tokenize()).parse())
+    interpreter.compiler.resolve(ast)
+    interpreter.reserve_slots()
+    interpreter.slots[ast[0].accumulator.slot] = 1.0
+    assert interpreter.reduce_loop(ast[0], 1.0, 10.0, 2.0)
+    assert interpreter.variables == {'S': 76.0, 'I': 11.0}
+
+def test_reduction_overflow_falls_back_quietly():
+    pytest.importorskip('numpy')
+    program = f'''
+    LET S = 0
+    LET K = 1{'0' * 308}
+    LET N = 3
+    FOR I = 1 TO N
+    LET S = S + I * K
+    NEXT
+    PRINT S, I
+    '''
+    for walk in (False, True):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            assert run_basic(program, walk=walk) == 'inf 4'
+
+def test_format_value():
+    assert format_value(42.0) == '42'
+    assert format_value(-0.0) == '0'
+    assert format_value(1e20) == '100000000000000000000'
+    assert format_value(2.5) == '2.5'
+    assert format_value(float('inf')) == 'inf'
+    assert format_value('text') == 'text'
+
+def test_undefined_variable():
+    with pytest.raises(Exception, match='Undefined variable: Y'):
+        run_basic('PRINT Y')
+
+def test_division_by_zero():
+    with pytest.raises(Exception, match='Division by zero'):
+        run_basic('PRINT 1 / 0')
+
+@pytest.mark.parametrize('program', [
+    'PRINT 2 + 3 * 4, 10 / 4, -(1 - 3)',
+    '''
+    LET X = 10
+    IF X > 5 THEN PRINT "Greater"
+    IF X <> 10 THEN PRINT "Different"
+    ''',
+    '''
+    LET N = 3
+    FOR I = 1 TO N
+    FOR J = I TO N
+    PRINT I * J
+    NEXT
+    NEXT
+    PRINT I, J
+    ''',
+    '''
+    FOR I = 1 TO 3
+    GOTO 3
+    PRINT I
+    NEXT
+    PRINT "skipped"
+    PRINT "done"
+    ''',
+    '''
+    FOR I = 5 TO 1 STEP -1
+    IF I <> 3 THEN PRINT I
+    IF I = 3 THEN LET I = 1
+    NEXT
+    FOR K = 1 TO 3 STEP 0
+    NEXT
+    PRINT I, K
+    ''',
+    '''
+    LET A = 1.5
+    LET B = "x"
+    PRINT A
+    PRINT A, B
+    PRINT A, B, A * 2
+    ''',
+    '''
+    LET S = 0
+    LET N = 1000
+    FOR I = 1 TO N
+    LET S = S + I * I - N / 4
+    NEXT
+    PRINT S, I
+    FOR J = 10 TO 1 STEP -3
+    LET S = S - J
+    NEXT
+    FOR K = 0 TO 1 STEP 0.1
+    LET S = S + K
+    NEXT
+    FOR K = 1 TO 0
+    LET S = S + 1
+    NEXT
+    PRINT S, J, K
+    ''',
+    '''
+    LET C = 0
+    FOR I = 10 TO 1 STEP -4
+    FOR J = 1 TO 2.5
+    PRINT "x"
+    LET C = C + 2
+    NEXT
+    NEXT
+    PRINT C, I, J
+    ''',
+])
+def test_tree_walker_matches_vm(program):
+    assert run_basic(program, walk=True) == run_basic(program)
+
+def test_cached_loop_body_is_per_interpreter():
+    ast = Parser(Lexer('''
+    FOR I = 1 TO 3
+    PRINT I
+    NEXT
+    ''').tokenize()).parse()
+    first, second = Interpreter(), Interpreter()
+    first.compiler.resolve(ast)
+    first.reserve_slots()
+    second.compiler.resolve(ast)
+    second.reserve_slots()
+    sys.stdout = StringIO()
+    try:
+        first.visit(ast[0])
+        second.visit(ast[0])
+    finally:
+        sys.stdout = sys.__stdout__
+    assert ast[0].bound_body(second._dispatch)[0][0] == second.visit_PrintNode
+    assert first.variables == second.variables == {'I': 4.0}
+
+def test_deep_expression_in_tree_walker():
+    expr = ' + '.join(['X'] * 400)
+    assert run_basic(f'LET X = 1\nPRINT {expr}', walk=True) == '400'
+
+def test_expression_code_follows_resolve():
+    ast = Parser(Lexer('PRINT A + B').tokenize()).parse()
+    first = Interpreter()
+    first.slots = [1.0, 2.0]
+    first.compiler.resolve(ast)
+    assert first.visit(ast[0].expressions[0]) == 3.0
+
+    second = Interpreter()
+    second.compiler.resolve(Parser(Lexer('LET B = 0').tokenize()).parse())
+    second.compiler.resolve(ast)
+    second.slots = [10.0, 20.0]
+    assert second.visit(ast[0].expressions[0]) == 30.0
+    second.slots[1] = None
+    with pytest.raises(Exception, match='Undefined variable: A'):
+        second.visit(ast[0].expressions[0])
+
+def test_repeated_lines_reuse_compiled_code(capsys):
+    basic = Basic()
+    basic.run_program('LET X = 1\nLET X = X * 2\nLET X = X * 2\nPRINT X')
+    assert capsys.readouterr().out == '4\n'
+    assert basic._compile.cache_info().hits == 1
+
+def test_loop_variable_after_error_in_body():
+    interpreter = Interpreter()
+    program = Parser(Lexer('''
+    LET C = 0
+    FOR I = 1 TO 5
+    LET C = C + 1
+    IF C = 3 THEN LET C = C / 0
+    NEXT
+    ''').tokenize()).parse()
+    with pytest.raises(Exception, match='Division by zero'):
+        interpreter.walk(program)
+    assert interpreter.variables['I'] == 3.0
+
+@pytest.mark.parametrize('program, message', [
+    ('LET Y = X = 1', 'Undefined variable: X'),
+    ('IF 1 <> X THEN PRINT 1', 'Undefined variable: X'),
+    ('PRINT +X = 1', 'Undefined variable: X'),
+    ('LET Y = 2 * (1 + X)', 'Undefined variable: X'),
+    ('LET X = 1\nPRINT X - Z', 'Undefined variable: Z'),
+    ('LET X = 1\nPRINT X / 0', 'Division by zero'),
+    ('LET X = 1\nPRINT 2 / (X - X)', 'Division by zero'),
+])
+def test_compiled_expression_errors(program, message):
+    for walk in (False, True):
+        with pytest.raises(Exception, match=message):
+            run_basic(program, walk=walk)
+
+def test_deeply_nested_expression():
+    depth = 210
+    program = 'LET X = 1\nPRINT ' + '1 - (' * depth + 'X' + ')' * depth
+    assert run_basic(program) == run_basic(program, walk=True) == '1'
+
+def test_variables_can_be_seeded(capsys):
+    basic = Basic()
+    basic.interpreter.variables['X'] = 5.0
+    basic.run_line('PRINT X * 2')
+    assert capsys.readouterr().out == '10\n'
+
+    interpreter = Interpreter()
+    interpreter.variables['N'] = 3.0
+    interpreter.walk(Parser(Lexer('LET S = N + 1').tokenize()).parse())
+    assert interpreter.variables == {'N': 3.0, 'S': 4.0}
+    del interpreter.variables['N']
+    assert 'N' not in interpreter.variables
+    with pytest.raises(KeyError):
+        interpreter.variables['N']
@@ -62,4 +62,58 @@ def test_basic_program():
     
     assert len(tokens) == len(expected_types)
     for token, expected_type in zip(tokens, expected_types):
-        assert token.type == expected_type
\ No newline at end of file
+        assert token.type == expected_type
+
+def test_keyword_and_operator_tokens_are_shared():
+    tokens = Lexer("PRINT X <= 1\nPRINT Y <= 2").tokenize()
+    assert tokens[0] is tokens[5]  # PRINT
+    assert tokens[2] is tokens[7]  # <=
+    assert tokens[1] is not tokens[6]
+    assert tokens[1].type == TokenType.IDENTIFIER
+
+def test_tokenize_matches_get_next_token():
+    program = '''LET X1 = 10.5 ' trailing comment
+    REM a full line comment, with "quotes"
+    LET REMAINDER = X1 rem trailing REM comment
+    PRINT "A, B", X1 <> 3
+    IF X1 >= 2 THEN PRINT (X1 - 1) * 2 / 4
+    '''
+    lexer = Lexer(program)
+    incremental = [lexer.get_next_token()]
+    while incremental[-1].type != TokenType.EOF:
+        incremental.append(lexer.get_next_token())
+    assert Lexer(program).tokenize() == incremental
+
+def test_invalid_character():
+    with pytest.raises(Exception, match='line 2, column 5'):
+        Lexer("PRINT 1\nLET @ = 2").tokenize()
+
+def test_rem_comments():
+    tokens = Lexer("REM comment\nLET RESULT = 1 REM RESULT is ignored").tokenize()
+    assert [t.type for t in tokens] == [
+        TokenType.EOL, TokenType.KEYWORD, TokenType.IDENTIFIER, TokenType.OPERATOR,
+        TokenType.NUMBER, TokenType.EOF,
+    ]
+    assert tokens[2].value == 'RESULT'
+
+def test_malformed_number():
+    with pytest.raises(Exception, match='column 4'):
+        Lexer("1.2.3").tokenize()
+    lexer = Lexer("1.2.3")
+    assert lexer.get_next_token().value == 1.2
+    with pytest.raises(Exception, match='column 4'):
+        lexer.get_next_token()
+
+def test_token_offsets():
+    lexer = Lexer('LET X = 1\nPRINT "A"')
+    tokens = lexer.tokenize()
+    assert [t.pos for t in tokens if t.type != TokenType.KEYWORD and t.type != TokenType.OPERATOR] == [4, 8, 9, 16, 19]
+    assert lexer.position(16) == (2, 7)
+
+def test_digit_that_is_not_a_number():
+    # '²' is a digit and alphanumeric, but starts neither a number nor a name
+    with pytest.raises(Exception, match='Invalid character at line 1, column 1'):
+        Lexer('²').get_next_token()
+    with pytest.raises(Exception, match='Invalid character at line 1, column 5'):
+        Lexer('LET ²X = 1').tokenize()
+    assert Lexer('X²').tokenize()[0].value == 'X²'
@@ -1,8 +1,10 @@
 import pytest
-from ..lexer import Lexer
+from ..lexer import Lexer, Token, TokenType
 from ..parser import (
     Parser, NumberNode, StringNode, BinOpNode, PrintNode, VariableNode, 
-    AssignNode, InputNode, IfNode, ForNode, GotoNode, UnaryOpNode
+    AssignNode, InputNode, IfNode, ForNode, GotoNode, UnaryOpNode,
+    IfCmpConstNode, ForConstRangeNode, PrintSingleVarNode, ReduceLoopNode,
+    fold_constants, rewrite_superinstructions, references
 )
 
 def parse_code(code: str):
@@ -148,4 +150,114 @@ def test_multiple_statements():
     assert len(ast) == 3
     assert isinstance(ast[0], AssignNode)
     assert isinstance(ast[1], PrintNode)
-    assert isinstance(ast[2], IfNode)
\ No newline at end of file
+    assert isinstance(ast[2], IfNode)
+
+def test_binary_operator_is_bound():
+    ast = parse_code("7 - 2 <= 5")
+    assert ast[0].op_fn(1.0, 2.0) == 1.0
+    assert ast[0].left.op_fn(7.0, 2.0) == 5.0
+
+def test_number_node_requires_float():
+    with pytest.raises(Exception, match='Invalid number literal'):
+        NumberNode(Token(TokenType.NUMBER, '42', 0))
+
+def test_fold_constants():
+    ast = fold_constants(parse_code('LET Y = X + 2 * (5 - -3)'))
+    assert isinstance(ast[0].value, BinOpNode)
+    assert isinstance(ast[0].value.left, VariableNode)
+    assert isinstance(ast[0].value.right, NumberNode)
+    assert ast[0].value.right.token.value == 16
+
+    ast = fold_constants(parse_code('''
+    FOR I = 1 TO 2 * 5
+    IF 3 < 4 THEN PRINT "Yes", 1 + 1
+    NEXT
+    '''))
+    assert ast[0].end.token.value == 10
+    assert ast[0].body[0].condition.token.value == 1.0
+    assert ast[0].body[0].then_statement.expressions[1].token.value == 2
+
+def test_fold_constants_keeps_division_by_zero():
+    ast = fold_constants(parse_code('PRINT 1 / 0'))
+    assert isinstance(ast[0].expressions[0], BinOpNode)
+
+def test_rewrite_superinstructions():
+    ast = rewrite_superinstructions(fold_constants(parse_code('''
+    FOR I = 10 TO 0 STEP -(1 + 1)
+    IF I >= 5 THEN PRINT I
+    IF 5 < I THEN PRINT I
+    NEXT
+    FOR J = 1 TO N
+    NEXT
+    ''')))
+    assert isinstance(ast[0], ForConstRangeNode)
+    assert (ast[0].start, ast[0].end, ast[0].step) == (10, 0, -2)
+    assert isinstance(ast[0].body[0], IfCmpConstNode)
+    assert ast[0].body[0].name == 'I'
+    assert ast[0].body[0].const == 5
+    assert ast[0].body[0].cmp_fn(5.0, 5.0)
+    assert isinstance(ast[0].body[0].then_statement, PrintSingleVarNode)
+    assert isinstance(ast[0].body[1], IfNode)
+    assert isinstance(ast[1], ForNode)
+
+def test_rewrite_reduction_loops():
+    ast = rewrite_superinstructions(fold_constants(parse_code('''
+    FOR I = 1 TO N
+    LET S = S + I * (K - 1)
+    NEXT
+    FOR I = 1 TO 10
+    LET S = S - 2
+    NEXT
+    FOR I = 1 TO 10
+    LET S = S + S
+    NEXT
+    FOR I = 1 TO 10
+    LET I = I + 1
+    NEXT
+    FOR I = 1 TO 10
+    LET S = S + "x"
+    NEXT
+    ''')))
+    assert isinstance(ast[0], ReduceLoopNode)
+    assert isinstance(ast[0].loop, ForNode)
+    assert ast[0].accumulator.name == 'S'
+    assert isinstance(ast[0].term, BinOpNode)
+    assert isinstance(ast[1], ReduceLoopNode)
+    assert isinstance(ast[1].loop, ForConstRangeNode)
+    assert ast[1].op_token.value == '-'
+    assert all(isinstance(node, ForConstRangeNode) for node in ast[2:])
+
+def test_nodes_have_no_instance_dict():
+    ast = parse_code('LET X = 1 + Y')
+    assert not hasattr(ast[0], '__dict__')
+    assert not hasattr(ast[0].value, '__dict__')
+    assert not hasattr(ast[0].value.op_token, '__dict__')
+
+def test_references():
+    program = rewrite_superinstructions(fold_constants(parse_code('''
+    FOR I = 1 TO 3
+    IF J > 1 THEN PRINT K
+    FOR L = 1 TO M
+    INPUT N
+    NEXT
+    NEXT
+    ''')))
+    loop = program[0]
+    for name in 'IJKLMN':
+        assert references(loop, name)
+    assert not references(loop, 'X')
+    assert not loop.body_uses_variable()
+
+def test_syntax_error_location():
+    with pytest.raises(Exception, match=r"line 2, column 5: unexpected 5\.0"):
+        parse_code('PRINT 1\nLET 5 = 2')
+    with pytest.raises(Exception, match='line 1, column 15: unexpected end of input'):
+        parse_code('LET X = (1 + 2')
+    # Shared keyword and operator tokens are located from the source text
+    with pytest.raises(Exception, match="line 2, column 5: unexpected '='"):
+        Parser(Lexer('PRINT 1\nLET = 3').tokenize(), 'PRINT 1\nLET = 3').parse()
+    with pytest.raises(Exception, match="line 1, column 10: unexpected 'PRINT'"):
+        Parser(Lexer('IF X > 1 PRINT 2').tokenize(), 'IF X > 1 PRINT 2').parse()
+    # ...and without it, only their line is reported
+    with pytest.raises(Exception, match="line 2: unexpected '\\*'"):
+        parse_code('PRINT 1\n  PRINT *')
@@ -0,0 +1,32 @@
+"""Build script for the BASIC interpreter.
+
+The package is pure Python. If Cython is installed, the lexer, parser,
+compiler and interpreter modules are additionally compiled to C extensions,
+which removes most of the interpreter's per-instruction overhead:
+
+    pip install cython
+    python setup.py build_ext --inplace
+"""
+from setuptools import setup
+
+COMPILED_MODULES = [
+    'basic_interpreter/lexer.py',
+    'basic_interpreter/parser.py',
+    'basic_interpreter/compiler.py',
+    'basic_interpreter/interpreter.py',
+]
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    # Type hints stay hints: without this, Cython enforces them at run time
+    ext_modules = cythonize(COMPILED_MODULES, language_level=3,
+                            compiler_directives={'annotation_typing': False})
+
+setup(
+    name='basic_interpreter',
+    packages=['basic_interpreter'],
+    ext_modules=ext_modules,
+)